@@ -1,20 +1,9 @@
 import sys
 import argparse
-from loguru import logger
 from pathlib import Path
-from src.utils.count_single_py_file_notes import CountSinglePyFileNotes
-from src.utils.count_files_notes import CountFilesNotes
-from src.utils.remove_single_py_file_notes import RemoveSinglePyFileNotes
-from src.utils.remove_files_notes import RemoveFilesNotes
 from src.__init__ import __version__
 
 
-class ArgsConflictError(Exception):
-    """Exception raised when there is a conflict in command line arguments."""
-
-    pass
-
-
 def parse_arguments():
     """
     Define argparse arguments and options
@@ -26,13 +15,15 @@ def parse_arguments():
     parser.add_argument(
         "PATH", help="Path to the file or directory to count or remove notes from"
     )
-    parser.add_argument(
+    # -c and -r conflict with each other, let argparse reject using both
+    mode_group = parser.add_mutually_exclusive_group()
+    mode_group.add_argument(
         "-c",
         "--count_notes",
         action="store_true",
-        help="Count notes from a .py file or a directory of .py files",
+        help="Count notes from a .py file or a directory of .py files (default)",
     )
-    parser.add_argument(
+    mode_group.add_argument(
         "-r",
         "--remove_notes",
         action="store_true",
@@ -61,6 +52,10 @@ def count_notes(args_path: Path) -> None:
         a single .py file
         or .py files in a directory
     """
+    # Imported here so that --version and argument errors stay fast
+    from src.utils.count_single_py_file_notes import CountSinglePyFileNotes
+    from src.utils.count_files_notes import CountFilesNotes
+
     if not args_path.exists():
         raise FileNotFoundError(f"File or directory not found: {args_path}")
 
@@ -74,6 +69,10 @@ def count_notes(args_path: Path) -> None:
 def remove_notes(args_path: Path) -> None:
     """
     Removes notes from a single .py file or .py files in a directory."""
+    # Imported here so that --version and argument errors do not load loguru
+    from src.utils.remove_single_py_file_notes import RemoveSinglePyFileNotes
+    from src.utils.remove_files_notes import RemoveFilesNotes
+
     if not args_path.exists():
         raise FileNotFoundError(f"File or directory not found: {args_path}")
 
@@ -89,13 +88,8 @@ def main():
     args_path = Path(args.PATH)
     # logger.debug(f"args_path: {args_path}")
 
-    if not args.remove_notes and not args.count_notes:
-        count_notes(args_path)
-    elif args.remove_notes and not args.count_notes:
+    # Counting notes is the default when neither -c nor -r is given
+    if args.remove_notes:
         remove_notes(args_path)
-    elif not args.remove_notes and args.count_notes:
+    else:
         count_notes(args_path)
-    elif args.remove_notes and args.count_notes:
-        raise ArgsConflictError(
-            "Should not provide both options -c and -r at the same time."
-        )
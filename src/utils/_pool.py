@@ -0,0 +1,49 @@
+import atexit
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+MAX_WORKERS = os.cpu_count() or 1
+# Files are submitted while the folder is still being walked, so the total
+# number of files is not known in advance; use a fixed batch size instead
+CHUNKSIZE = 32
+# Below this many files, starting the workers and pickling the results
+# costs more than the parallelism saves: run them in this process instead
+SERIAL_THRESHOLD = 8
+
+_R = TypeVar("_R")
+
+
+@functools.lru_cache(maxsize=1)
+def get_pool() -> ProcessPoolExecutor:
+    """
+    Returns the process pool shared by CountFilesNotes and RemoveFilesNotes.
+
+    The pool is created on first use and reused for the rest of the process,
+    so the worker start-up cost (high on Windows, where workers are spawned)
+    is paid only once.
+    """
+    pool = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+    atexit.register(pool.shutdown, wait=False)
+    return pool
+
+
+def map_files(
+    fn: Callable[[str], _R],
+    py_files: Iterable[str],
+    serial_fn: Optional[Callable[[str], _R]] = None,
+) -> Iterator[_R]:
+    """
+    Maps fn over the files on the shared process pool, in order.
+
+    Only the first SERIAL_THRESHOLD files are walked before deciding:
+    a smaller batch, or a single-core machine, is handled in this process
+    by serial_fn (fn if not given) without starting the pool at all.
+    """
+    py_files = iter(py_files)
+    head = list(islice(py_files, SERIAL_THRESHOLD))
+    if len(head) < SERIAL_THRESHOLD or MAX_WORKERS == 1:
+        return map(serial_fn or fn, chain(head, py_files))
+    return get_pool().map(fn, chain(head, py_files), chunksize=CHUNKSIZE)
@@ -1,12 +1,23 @@
-import json
+import sys
 from pathlib import Path
 
-from loguru import logger
-
 if __name__ == "__main__":
+    from _pool import map_files
     from count_single_py_file_notes import CountSinglePyFileNotes
+    from iter_py_files import iter_py_files
 else:
+    from src.utils._pool import map_files
     from src.utils.count_single_py_file_notes import CountSinglePyFileNotes
+    from src.utils.iter_py_files import iter_py_files
+
+
+def _analyze_one(py_file_path: str) -> tuple[str, dict]:
+    """
+    Analyze a single .py file in a worker process.
+    Takes and returns plain str paths so the arguments stay cheap to pickle.
+    """
+    count_single_file = CountSinglePyFileNotes(Path(py_file_path))
+    return py_file_path, count_single_file.get_notes_details_dict()
 
 
 class CountFilesNotes:
@@ -17,10 +28,9 @@ class CountFilesNotes:
         folder_path: str,
 
     attributes:
-        py_files_list: list[Path], A list of all .py files in the specified folder.
         result_dict: dict, Dictionary storing comment information for each .py file
             key is the path to the file.
-            value is the comment information in JSON format.
+            value is the comment information dict (see get_notes_details_dict).
 
     methods:
         print_notes_details(self) -> None: Prints the comment information for each .py file
@@ -29,51 +39,51 @@ class CountFilesNotes:
 
     def __init__(self, folder_path: Path):
         self.folder_path = folder_path
-        self.py_files_list = self.__generate_py_files_list()
         self.result_dict = {}
         self.__analyze_each_py_file()
 
-    def __generate_py_files_list(self) -> list:
-        py_files_list: list[Path] = []
-        for py_file_path in Path(self.folder_path).rglob("*.py"):
-            py_files_list.append(py_file_path)
-        return py_files_list
-
     def __analyze_each_py_file(self) -> None:
-        for py_file_path in self.py_files_list:
-            count_single_file = CountSinglePyFileNotes(py_file_path)
-            # Get comment details in JSON format
-            json_notes_details = count_single_file.get_notes_details()
-            # Store the JSON string in the results dictionary
+        # Analyzing is CPU-bound, so fan the files out over all cores.
+        # The walker is passed in directly, so workers start on the first
+        # files while the rest of the folder is still being walked.
+        results = map_files(_analyze_one, iter_py_files(self.folder_path))
+        for py_file_path, notes_details in results:
+            # Store the comment information in the results dictionary
             # key is the path to the file.
-            # value is the comment information in JSON format.
-            self.result_dict[py_file_path] = json_notes_details
+            # value is the comment information as a dict.
+            self.result_dict[py_file_path] = notes_details
 
     def print_notes_details(self) -> None:
-        for k, v in self.result_dict.items():
-            print("=" * 80)
-            print(f"文件名：{k.name}")
-            # logger.debug(f"\nJSON Format Value：\n{v}\n")
-            print("注释信息：")
-            print("-" * 80)
-            print("行号\t注释内容")
-            notes_details = json.loads(v)
+        # Build the whole report of a file and write it at once,
+        # instead of issuing one print() per line
+        write = sys.stdout.write
+        for k, notes_details in self.result_dict.items():
+            out = [
+                "=" * 80,
+                f"文件名：{Path(k).name}",
+                "注释信息：",
+                "-" * 80,
+                "行号\t注释内容",
+            ]
             for note_entry in notes_details["注释信息"]:
                 line_number = note_entry["行号"]
-                note_content = repr(note_entry["内容"].replace("\\n", "\n")).strip("'")
-                print(f"{line_number}\t{note_content}")
-            print("-" * 80)
-            print(
+                note_content = repr(note_entry["内容"]).strip("'")
+                out.append(f"{line_number}\t{note_content}")
+            out.append("-" * 80)
+            out.append(
                 f"注释行数：\t{notes_details['注释行数']}\t\t总行数：\t{notes_details['总行数']}\t\t注释占比：\t{notes_details['注释占比']:.0f}%"
             )
-            print(
+            out.append(
                 f"注释字母数：\t{notes_details['注释字母数']}\t\t总字母数：\t{notes_details['总字母数']}\t\t注释字母占比：\t{notes_details['注释字母占比']:.0f}%"
             )
-        print("=" * 80)
+            out.append("")
+            write("\n".join(out))
+        write("=" * 80 + "\n")
+        sys.stdout.flush()
 
 
 def test():
-    folder_path = Path("tests\examples")
+    folder_path = Path("tests/examples")
     result = CountFilesNotes(folder_path)
     result.print_notes_details()
 
@@ -1,8 +1,23 @@
+import heapq
 import json
 import re
+import tokenize
+from itertools import groupby, repeat
+from operator import itemgetter
 from pathlib import Path
 
-from loguru import logger
+if __name__ == "__main__":
+    from note_tokens import find_note_tokens
+    from scan_notes import scan_notes
+    from source_file import decode_source, may_have_notes, read_source_bytes
+else:
+    from src.utils.note_tokens import find_note_tokens
+    from src.utils.scan_notes import scan_notes
+    from src.utils.source_file import decode_source, may_have_notes, read_source_bytes
+
+# 多行注释（逐行分析时使用），在模块加载时编译一次
+# 只保留引号与内容两个捕获组，匹配时少分配一个分组
+_MULTI_LINE_RE = re.compile(r'(?<!\( )(\'{3}|"{3})(.+?)\1(?!\s*\))', re.DOTALL)
 
 
 class CountSinglePyFileNotes:
@@ -13,7 +28,7 @@ class CountSinglePyFileNotes:
         file_path: 文件路径
 
     attributes:
-        notes_dict: 字典，key 为注释所在行数，value 为注释内容
+        notes_list: 列表，元素为 (注释所在行数, 注释内容)，按行号顺序排列
         notes_line_number: 注释行数
         total_line_number: 总行数
         notes_line_percentage: 注释行数占比
@@ -25,11 +40,12 @@ class CountSinglePyFileNotes:
     methods:
         print_notes_details: 打印注释信息
         get_notes_details: 获取注释信息，以JSON 格式返回
+        get_notes_details_dict: 获取注释信息，以字典格式返回
 
     """
 
     def __init__(self, file_path: Path):
-        self.notes_dict: dict = dict()
+        self.notes_list: list[tuple[int, str]] = []
         self.file_content: str = ""
         self.notes_line_number: int = 0
         self.total_line_number: int = 0
@@ -38,7 +54,6 @@ class CountSinglePyFileNotes:
         self.total_letter_number: int = 0
         self.notes_letter_percentage: float = 0.0
         self.__analyze_file(file_path)
-        self.__fix_note_dict()
         self.__calculate_notes_line_percentage()
         self.__calculate_notes_letter_percentage()
 
@@ -49,7 +64,7 @@ class CountSinglePyFileNotes:
         print("注释信息：")
         print("-" * 80)
         print("行号\t注释内容")
-        for k, v in self.notes_dict.items():
+        for k, v in self.notes_list:
             print(k, "\t", repr(v).strip("'"))
         print("-" * 80)
         print(
@@ -59,12 +74,12 @@ class CountSinglePyFileNotes:
             f"注释字母数：\t{self.notes_letter_number}\t\t总字母数：\t{self.total_letter_number}\t\t注释字母占比：\t{self.notes_letter_percentage:.0f}%\n"
         )
 
-    def get_notes_details(self) -> str:
+    def get_notes_details_dict(self) -> dict:
         """
-        获取注释信息并以 JSON 格式返回
+        获取注释信息并以字典格式返回
         """
-        notes_details = {
-            "注释信息": [],
+        return {
+            "注释信息": [{"行号": k, "内容": v} for k, v in self.notes_list],
             "注释行数": self.notes_line_number,
             "总行数": self.total_line_number,
             "注释占比": self.notes_line_percentage,
@@ -73,12 +88,14 @@ class CountSinglePyFileNotes:
             "注释字母占比": self.notes_letter_percentage,
         }
 
-        for k, v in self.notes_dict.items():
+    def get_notes_details(self) -> str:
+        """
+        获取注释信息并以 JSON 格式返回
+        """
+        notes_details = self.get_notes_details_dict()
+        for note_entry in notes_details["注释信息"]:
             # 将注释内容转换为 JSON 字符串时，确保换行符被转义
-            notes_details["注释信息"].append(
-                {"行号": k, "内容": v.replace("\n", "\\n")}
-            )
-            # logger.debug(f"行号：{k}，注释内容：{v}")
+            note_entry["内容"] = note_entry["内容"].replace("\n", "\\n")
 
         # 将字典转换为 JSON 字符串
         # logger.debug(f"notes_details: {notes_details}")
@@ -88,8 +105,13 @@ class CountSinglePyFileNotes:
         """
         计算注释行数占比
         """
-        self.notes_line_number = len(self.notes_dict)
-        self.total_line_number = len(self.file_content.split("\n"))
+        # 同一行可能同时有字符串和注释，按行号去重
+        # notes_list 已按行号排序，相邻分组即可，无需构造行号集合
+        self.notes_line_number = sum(
+            1 for _ in groupby(self.notes_list, key=itemgetter(0))
+        )
+        # 与 len(split("\n")) 结果相同，但不需要构造行列表
+        self.total_line_number = self.file_content.count("\n") + 1
         if self.total_line_number == 0:
             self.notes_line_percentage = 0.0
         else:
@@ -101,10 +123,9 @@ class CountSinglePyFileNotes:
         """
         计算注释字母数占比
         """
-        notes_set = set()
-        for v in self.notes_dict.values():
-            notes_set.add(v)
-        self.notes_letter_number = sum(len(v) for v in notes_set)
+        # 相同内容的注释（如多行注释占据的每一行）只计一次
+        unique_notes = set(map(itemgetter(1), self.notes_list))
+        self.notes_letter_number = sum(map(len, unique_notes))
         self.total_letter_number = len(self.file_content)
         if self.total_letter_number == 0:
             self.notes_letter_percentage = 0.0
@@ -114,70 +135,143 @@ class CountSinglePyFileNotes:
             ) * 100
 
     def __add_note(self, line_number: int, note_content: str) -> None:
-        self.notes_dict[line_number] = note_content
+        self.notes_list.append((line_number, note_content))
+
+    def __add_multi_line_note(
+        self, start_line: int, end_line: int, note_content: str
+    ) -> None:
+        """
+        多行注释占据的每一行都记录同一注释内容，一次 extend 完成，不逐行调用 __add_note
+        """
+        self.notes_list.extend(
+            zip(range(start_line, end_line + 1), repeat(note_content))
+        )
 
-    def __fix_note_dict(self) -> None:
+    def __fix_notes_list(self) -> None:
         """
-        修正 notes_dict，尝试去除多行注释间的正常代码行，不完美，但能解决大部分情况
+        修正 notes_list，尝试去除多行注释间的正常代码行，不完美，但能解决大部分情况
         """
-        for k, v in list(self.notes_dict.items()):
-            if '"""' in v or "'''" in v:
-                self.notes_dict.pop(k)
-            elif v.startswith(","):
-                self.notes_dict.pop(k)
-            elif "+" in v and v.endswith("= "):
-                self.notes_dict.pop(k)
+        self.notes_list = [
+            (k, v)
+            for k, v in self.notes_list
+            if not (
+                '"""' in v
+                or "'''" in v
+                or v.startswith(",")
+                or ("+" in v and v.endswith("= "))
+            )
+        ]
 
     def __analyze_file(self, file_path: Path) -> None:
         """
-        分析文件内容，构造 notes_dict
+        分析文件内容，构造 notes_list
         """
         try:
-            self.file_content = file_path.read_text()
-            # 分析单行注释
-            self.__analyze_single_line_note()
-            # 分析多行注释
-            self.__analyze_multi_line_comment()
+            raw = read_source_bytes(file_path)
+            try:
+                self.file_content, _ = decode_source(raw)
+            except (SyntaxError, LookupError, UnicodeDecodeError) as e:
+                # 编码声明无效或内容无法按其解码：报告并跳过该文件，不中断整个目录的统计
+                print(f"Error: {e}\nfile_path: {file_path}")
+                return
+            if not may_have_notes(raw):
+                # 没有 '#' 和三引号的文件不可能有注释，跳过 tokenize
+                return
+            try:
+                # 基于 tokenize 分析注释和文档字符串
+                self.__analyze_comments_with_tokenize(raw)
+            except (tokenize.TokenError, SyntaxError) as e:
+                # 无法被 tokenize 解析的文件，退回逐行分析
+                # loguru 只在这条少见的分支中才导入，正常路径不承担其导入开销
+                from loguru import logger
+
+                logger.warning(f"Tokenize failed, fallback to line analysis: {e}")
+                self.notes_list.clear()
+                self.__fallback_analysis()
         except (IndexError, FileNotFoundError) as e:
             print(f"Error: {e}\nfile_path: {file_path}")
 
+    def __analyze_comments_with_tokenize(self, raw: bytes) -> None:
+        """
+        使用 tokenize 分析注释
+        （COMMENT 记号，以及独立成句的三引号字符串）
+        字符串中的 '#' 与表达式中的三引号字符串不会被误判为注释
+
+        记号扫描由 find_note_tokens 完成，删除注释时使用同样的结果
+        """
+        comments, docstrings = find_note_tokens(raw)
+        # 去掉 '#'
+        comment_notes = [
+            (line_number, string[1:]) for line_number, _, string in comments
+        ]
+        if not docstrings:
+            self.notes_list.extend(comment_notes)
+            return
+        for start_line, end_line, string in docstrings:
+            self.__process_docstrings_and_strings(start_line, end_line, string)
+        # 两者各自按行号有序，归并即可；同一行上文档字符串在注释之前
+        self.notes_list = list(
+            heapq.merge(self.notes_list, comment_notes, key=itemgetter(0))
+        )
+
+    def __process_docstrings_and_strings(
+        self, start_line: int, end_line: int, string: str
+    ) -> None:
+        """
+        记录独立的三引号字符串（文档字符串），其占据的每一行都记为注释行
+        """
+        prefix_length = len(string) - len(string.lstrip("rRbBuUfF"))
+        note_content = string[prefix_length + 3 : -3]
+        self.__add_multi_line_note(start_line, end_line, note_content)
+
+    def __fallback_analysis(self) -> None:
+        """
+        逐行分析注释，用于 tokenize 无法解析的文件
+        """
+        # 分析单行注释
+        self.__analyze_single_line_note()
+        # 分析多行注释
+        self.__analyze_multi_line_comment()
+        self.__fix_notes_list()
+        # 单行注释与多行注释分两遍收集，按行号恢复顺序（稳定排序）
+        self.notes_list.sort(key=itemgetter(0))
+
     def __analyze_single_line_note(self) -> None:
         """
         分析单行注释
         （以 '#' 开头的行 和 行中有 '#' 且 '#' 后面有内容）
         """
-        for i, line in enumerate(self.file_content.split("\n")):
-            if line.startswith("#"):
-                # logger.debug(f"单行注释：{line}")
-                self.__add_note(i + 1, line[1:])  # 从第二个字符开始截取
-            elif "#" in line:
-                # logger.debug(f"行中有 '#' 且 '#' 后面有内容：{line}")
-                index = line.index("#")
-                self.__add_note(i + 1, line[index + 1 :])  # 从 '#' 符号后面开始截取
-            else:
-                continue
+        # scan_notes 单遍扫描全文并跟踪字符串字面量，字符串中的 '#' 不会被当作注释
+        _, comment_columns = scan_notes(self.file_content)
+        lines = self.file_content.split("\n")
+        for line_number, index in comment_columns.items():
+            # 从 '#' 符号后面开始截取
+            self.__add_note(line_number, lines[line_number - 1][index + 1 :])
 
     def __analyze_multi_line_comment(self) -> None:
         """
         分析多行注释
         （被\"\"\" 或 \'\'\' 包裹，且不在函数体内（外层没有被括号包裹））
         """
-        pattern = r'(?s)(?<!\( )((\'{3}|"{3})(.+?)\2)(?!\s*\))'
-        matches = re.findall(pattern, self.file_content)
-        for match in matches:
-            start_line = (
-                self.file_content.count("\n", 0, self.file_content.find(match[0])) + 1
-            )
-            end_line = start_line + match[0].count("\n")
-            note_content = match[2]
+        # 只统计上一个匹配结束到当前匹配开始之间的换行符，整个文件只扫描一遍
+        newlines_so_far = 0
+        prev_end = 0
+        for match in _MULTI_LINE_RE.finditer(self.file_content):
+            start, end = match.span()
+            newlines_so_far += self.file_content.count("\n", prev_end, start)
+            start_line = newlines_so_far + 1
+            body_newlines = self.file_content.count("\n", start, end)
+            end_line = start_line + body_newlines
+            newlines_so_far += body_newlines
+            prev_end = end
+            note_content = match.group(2)
             # logger.debug(f"多行注释：{note_content}")
-            for i in range(start_line, end_line + 1):
-                self.__add_note(i, note_content)
+            self.__add_multi_line_note(start_line, end_line, note_content)
 
 
 def test():
     print("Test Print . /tests/examples/example.py file comment information")
-    py_file_path = Path("tests\examples\example.py")
+    py_file_path = Path("tests/examples/example.py")
     result = CountSinglePyFileNotes(py_file_path)
     result.print_notes_details()
 
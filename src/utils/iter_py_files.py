@@ -0,0 +1,44 @@
+import os
+from pathlib import Path
+from typing import Iterator
+
+
+def iter_py_files(root: Path) -> Iterator[str]:
+    """
+    Recursively yields the paths of all .py files under root, as str.
+
+    Walks the tree with an explicit stack of os.scandir calls instead of
+    Path.rglob("*.py"), so no Path object or fnmatch call is needed per entry.
+    Directories are visited top-down, files of a directory before its
+    subdirectories. Symlinks are not followed.
+    """
+    stack = [os.fspath(root)]
+    while stack:
+        dir_path = stack.pop()
+        sub_dirs = []
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    # Plain suffix check on the name first: no fnmatch, no
+                    # Path object, and no is_dir() call for the .py files
+                    if entry.name.endswith(".py") and entry.is_file(
+                        follow_symlinks=False
+                    ):
+                        yield entry.path
+                    elif entry.is_dir(follow_symlinks=False):
+                        sub_dirs.append(entry.path)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            # Same as rglob: silently skip directories that can not be listed
+            continue
+        # Reversed so that the first sub directory is walked first
+        stack.extend(reversed(sub_dirs))
+
+
+def test():
+    for py_file_path in iter_py_files(Path("tests/examples")):
+        print(py_file_path)
+
+
+if __name__ == "__main__":
+    print("Test list all .py files in ./tests/examples folder")
+    test()
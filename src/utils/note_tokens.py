@@ -0,0 +1,108 @@
+import codecs
+import io
+import sys
+import tokenize
+
+if __name__ == "__main__":
+    from source_file import has_triple_quotes
+else:
+    from src.utils.source_file import has_triple_quotes
+
+# Token classification tables for the standalone string check, built once
+_SKIP_TOKEN_TYPES = frozenset(
+    {tokenize.NL, tokenize.INDENT, tokenize.DEDENT, tokenize.ENCODING}
+)
+_STATEMENT_END_TYPES = frozenset({tokenize.NEWLINE, tokenize.ENDMARKER})
+_TRIPLE_QUOTES = frozenset({'"""', "'''"})
+
+if sys.version_info >= (3, 12):
+    # Since 3.12 tokenize is backed by this C iterator, which yields plain
+    # (type, string, start, end, line) tuples when called directly:
+    # no TokenInfo is built and no generator wrapper runs per token.
+    # Before 3.12 it can not report comments, so tokenize.tokenize is used.
+    from _tokenize import TokenizerIter as _TokenizerIter
+else:
+    _TokenizerIter = None
+
+
+def _iter_tokens(raw: bytes):
+    """
+    Iterates over the tokens of a source file given as bytes,
+    with the encoding taken from its PEP 263 cookie or BOM
+    """
+    if _TokenizerIter is None:
+        return tokenize.tokenize(io.BytesIO(raw).readline)
+    encoding, _ = tokenize.detect_encoding(io.BytesIO(raw).readline)
+    if raw.startswith(codecs.BOM_UTF8):
+        # Same as tokenize.tokenize: the BOM is not part of the first line
+        raw = raw[len(codecs.BOM_UTF8) :]
+        encoding = "utf-8"
+    return _TokenizerIter(
+        io.BytesIO(raw).readline, encoding=encoding, extra_tokens=True
+    )
+
+
+def find_note_tokens(
+    raw: bytes,
+) -> tuple[tuple[tuple[int, int, str], ...], tuple[tuple[int, int, str], ...]]:
+    """
+    Tokenizes a source file once and returns its notes, the same way for
+    the counter and the remover:
+        comments: (line number, column of '#', comment text) of every COMMENT token,
+            so that '#' inside string literals is not taken as a comment
+        docstrings: (first line, last line, string) of every standalone
+            triple-quoted string (docstrings and string statements, f-strings aside):
+            a STRING token that starts a statement and is directly followed by its end
+    Both are in line order.
+    Raises tokenize.TokenError or SyntaxError if the file can not be tokenized.
+    """
+    # Names used by every iteration are bound to locals,
+    # and tokens are unpacked instead of read through namedtuple attributes
+    COMMENT = tokenize.COMMENT
+    STRING = tokenize.STRING
+    NEWLINE = tokenize.NEWLINE
+    skip_types = _SKIP_TOKEN_TYPES
+    statement_end_types = _STATEMENT_END_TYPES
+    triple_quotes = _TRIPLE_QUOTES
+    comments = []
+    tokens = _iter_tokens(raw)
+    if not has_triple_quotes(raw):
+        # No docstring possible: only the comment tokens matter
+        for token_type, string, start, _, _ in tokens:
+            if token_type == COMMENT:
+                comments.append((start[0], start[1], string))
+        return tuple(comments), ()
+
+    docstrings = []
+    # The file start counts as a statement boundary
+    prev_type = NEWLINE
+    pending_string = None  # (first line, last line, string) of the candidate string
+    for token_type, string, start, end, _ in tokens:
+        if token_type == COMMENT:
+            comments.append((start[0], start[1], string))
+            continue
+        if token_type in skip_types:
+            continue
+        if pending_string is not None:
+            if token_type in statement_end_types:
+                docstrings.append(pending_string)
+            pending_string = None
+        if (
+            token_type == STRING
+            and prev_type == NEWLINE
+            # f-strings are left alone: they may run code, and since 3.12 they
+            # are not STRING tokens, so every version treats them the same way
+            and string.lstrip("rRbBuU")[:3] in triple_quotes
+        ):
+            pending_string = start[0], end[0], string
+        prev_type = token_type
+    return tuple(comments), tuple(docstrings)
+
+
+def test():
+    raw = b'"""doc"""\nx = "#no"  # yes\n'
+    print(find_note_tokens(raw))
+
+
+if __name__ == "__main__":
+    test()
@@ -1,13 +1,56 @@
+import functools
+import sys
 from pathlib import Path
+from typing import Iterable
 
 from loguru import logger
 
 if __name__ == "__main__":
+    from _pool import map_files
+    from iter_py_files import iter_py_files
     from remove_single_py_file_notes import RemoveSinglePyFileNotes
 else:
+    from src.utils._pool import map_files
+    from src.utils.iter_py_files import iter_py_files
     from src.utils.remove_single_py_file_notes import RemoveSinglePyFileNotes
 
 
+@functools.lru_cache(maxsize=1)
+def _setup_worker_logger() -> None:
+    """
+    Runs once per worker process: only keep SUCCESS and above,
+    the per-note INFO records would otherwise dominate the runtime of a batch.
+    """
+    logger.remove()
+    logger.add(sys.stderr, level="SUCCESS")
+
+
+def _remove_file(py_file_path: str) -> None:
+    """
+    Remove notes from a single .py file.
+    """
+    logger.info(f"Removing notes from {py_file_path}...")
+    RemoveSinglePyFileNotes(Path(py_file_path))
+
+
+def _remove_one(py_file_path: str) -> None:
+    """
+    Remove notes from a single .py file in a worker process.
+    """
+    _setup_worker_logger()
+    _remove_file(py_file_path)
+
+
+def run_batch(py_files: Iterable[str]) -> None:
+    """
+    Remove notes from many .py files, spread over the shared process pool
+    (small batches are handled in this process, keeping its logger as is).
+    """
+    # Consume the results so that exceptions raised in workers surface here
+    for _ in map_files(_remove_one, py_files, serial_fn=_remove_file):
+        pass
+
+
 class RemoveFilesNotes:
     """
     Remove notes from all.py files in a folder
@@ -18,14 +61,12 @@ class RemoveFilesNotes:
         self.__remove_notes()
 
     def __remove_notes(self):
-        for py_file_path in Path(self.folder_path).rglob("*.py"):
-            logger.info(f"Removing notes from {py_file_path}...")
-            RemoveSinglePyFileNotes(py_file_path)
+        run_batch(iter_py_files(self.folder_path))
 
 
 def test():
     print("Test remove notes from .py files in ./tests/examples folder")
-    folder_path = Path("tests\examples")
+    folder_path = Path("tests/examples")
     RemoveFilesNotes(folder_path)
 
 
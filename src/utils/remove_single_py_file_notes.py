@@ -1,10 +1,115 @@
-import json
 import re
-import shutil
+import tokenize
+from itertools import accumulate, count
+from operator import add
 from pathlib import Path
+from typing import Optional
 
 from loguru import logger
 
+if __name__ == "__main__":
+    from note_tokens import find_note_tokens
+    from scan_notes import scan_notes
+    from source_file import (
+        decode_source,
+        may_have_notes,
+        read_source_bytes,
+        write_source_bytes,
+    )
+else:
+    from src.utils.note_tokens import find_note_tokens
+    from src.utils.scan_notes import scan_notes
+    from src.utils.source_file import (
+        decode_source,
+        may_have_notes,
+        read_source_bytes,
+        write_source_bytes,
+    )
+
+
+# PEP 263 coding cookie, only honored on the first two lines
+_CODING_COOKIE_RE = re.compile(r"^[ \t\f]*#.*?coding[:=]", re.ASCII)
+_LONE_CR_RE = re.compile(r"\r(?!\n)")
+# Runs of lines to drop (1) or to replace by 'pass' (2) in a remove mask
+_MASK_RUN_RE = re.compile(rb"\x01+|\x02+")
+
+
+def _header_comment_lines(src: str) -> list[int]:
+    """
+    Returns the line numbers (1 and/or 2) of the comments that must survive:
+    the shebang and the coding cookie. Removing the cookie of a non-UTF-8 file
+    would leave content that is no longer decoded the way it was written.
+    """
+    header_lines = []
+    for index, line in enumerate(src.split("\n", 2)[:2]):
+        if (index == 0 and line.startswith("#!")) or _CODING_COOKIE_RE.match(line):
+            header_lines.append(index + 1)
+    return header_lines
+
+
+def _line_starts(src: str) -> list[int]:
+    """
+    Returns the offset of the start of every line, followed by len(src) + 1
+    (where a line after the last one would start), so that line n spans
+    line_starts[n - 1] to line_starts[n] - 1 (its newline) with O(1) lookups.
+    Built from the line lengths with map/accumulate, without a Python-level loop.
+    """
+    return list(map(add, accumulate(map(len, src.split("\n")), initial=0), count()))
+
+
+def _remove_mask(
+    src: str, line_starts: list[int], line_ranges, comment_columns: dict
+) -> bytearray:
+    """
+    Returns a byte per line number (1-based, index 0 unused), set to 1 on every
+    line of the given (first line, last line) ranges.
+    Each range is marked with one slice assignment, not line by line,
+    and a line is then checked with a byte load instead of a set lookup.
+
+    A string that is the only statement of a block (e.g. the docstring of an
+    otherwise empty class) can not simply be dropped, or the block header would
+    be left without a body: its lines are set to 2 instead, to be replaced by 'pass'.
+    Only the lines around each range are sliced out of src (through line_starts,
+    see _line_starts) to check that.
+    """
+    last_line_number = len(line_starts) - 1
+    remove_mask = bytearray(last_line_number + 1)
+    if not line_ranges:
+        return remove_mask
+    for first_line, last_line, *_ in line_ranges:
+        remove_mask[first_line : last_line + 1] = b"\x01" * (last_line - first_line + 1)
+
+    def line_of(line_number: int) -> str:
+        return src[line_starts[line_number - 1] : line_starts[line_number] - 1]
+
+    def code_of(line_number: int) -> str:
+        # The code on a line that is kept, without its comment
+        if remove_mask[line_number] == 1:
+            return ""
+        line = line_of(line_number)
+        column = comment_columns.get(line_number)
+        return (line if column is None else line[:column]).strip()
+
+    for first_line, last_line, *_ in line_ranges:
+        # The first statement of a block: the previous line of code ends with ':'
+        previous_line = first_line - 1
+        while previous_line > 0 and not code_of(previous_line):
+            previous_line -= 1
+        if previous_line == 0 or not code_of(previous_line).endswith(":"):
+            continue
+        # ...and the only one: the next line of code is indented less (or missing)
+        line = line_of(first_line)
+        indent = len(line) - len(line.lstrip())
+        next_line = last_line + 1
+        while next_line <= last_line_number and not code_of(next_line):
+            next_line += 1
+        if next_line <= last_line_number:
+            line = line_of(next_line)
+            if len(line) - len(line.lstrip()) >= indent:
+                continue
+        remove_mask[first_line : last_line + 1] = b"\x02" * (last_line - first_line + 1)
+    return remove_mask
+
 
 class RemoveSinglePyFileNotes:
     """
@@ -13,25 +118,41 @@ class RemoveSinglePyFileNotes:
     parameters:
         file_path: Path, Path to the file from which you want to delete the comment
 
+    attributes:
+        removed_notes_number: int, Number of single-line comments removed
+        removed_multi_line_comments_number: int, Number of multi-line comments removed
+
     """
 
     def __init__(self, file_path: Path):
+        self.file_buffer: bytes = b""
         self.file_content: str = ""
         self.file_path = file_path
-        self.__create_backup(file_path)
+        self.removed_notes_number: int = 0
+        self.removed_multi_line_comments_number: int = 0
         self.__analyze_file(file_path)
 
     def __create_backup(self, file_path: Path) -> None:
         """
-        Create a backup of the file before modifying it
+        Create a backup of the file before modifying it,
+        unless an identical backup already exists
         """
         # Ensure the file exists before attempting to create a backup
         if file_path.exists():
             # Create a backup file path by adding .bak before the existing suffix
             backup_file_path = file_path.with_suffix(".py.bak")
             try:
-                # Copy the file to the backup file path
-                shutil.copy(str(file_path), str(backup_file_path))
+                # On re-runs the backup often matches already: one stat, no copy
+                if (
+                    backup_file_path.is_file()
+                    and backup_file_path.stat().st_size == len(self.file_buffer)
+                    and read_source_bytes(backup_file_path) == self.file_buffer
+                ):
+                    logger.info(f"Backup up to date: {backup_file_path}")
+                    return
+                # The original bytes are already in memory: write them out
+                # instead of reading the file again (and no copymode chmod)
+                write_source_bytes(backup_file_path, self.file_buffer)
                 logger.success(f"Backup created: {backup_file_path}")
             except FileNotFoundError as e:
                 logger.error(f"Error: The file '{file_path}' does not exist.")
@@ -49,71 +170,160 @@ class RemoveSinglePyFileNotes:
         Analyze the contents of the file and remove comments
         """
         try:
-            self.file_content = file_path.read_text()
-            # Analyzing single-line comments
-            self.__analyze_single_line_note()
-            # Analyzing multi-line comments
-            self.__analyze_multi_line_comment()
-            # Write the modified file
-            Path.write_text(self.file_path, self.file_content)
+            # Keep the raw bytes: tokenize works on them directly, without re-encoding
+            self.file_buffer = read_source_bytes(file_path)
+            if not may_have_notes(self.file_buffer):
+                # Nothing to remove: no tokenizing, no backup and no rewrite
+                logger.info(f"No notes found, skipped: {file_path}")
+                return
+            try:
+                self.file_content, encoding = decode_source(self.file_buffer)
+            except (SyntaxError, LookupError, UnicodeDecodeError) as e:
+                # Bad coding cookie or undecodable content: report and leave the file alone
+                logger.error(f"Error: can not decode {file_path}: {e}")
+                return
+            notes = self.__analyze_tokens()
+            if notes is None:
+                # Tokenize failed, fall back to scanning the text
+                notes = self.__analyze_with_scanner()
+            comment_columns, line_ranges = notes
+            for line_number in _header_comment_lines(self.file_content):
+                comment_columns.pop(line_number, None)
+            if b"\r\n" in self.file_buffer:
+                # The notes were found on the normalized text (same line numbers
+                # and columns); rebuild from the text with its own line endings,
+                # so that each line keeps its own, mixed endings included
+                self.file_content = _LONE_CR_RE.sub(
+                    "\n", self.file_buffer.decode(encoding)
+                )
+            # One line start table for the text, shared by the mask and the rebuild
+            line_starts = _line_starts(self.file_content)
+            remove_mask = _remove_mask(
+                self.file_content, line_starts, line_ranges, comment_columns
+            )
+            # Both kinds of notes are removed in the same pass over the text
+            self.__rebuild_without_notes(comment_columns, remove_mask, line_starts)
+            # Write the modified file, with the original encoding
+            new_buffer = self.file_content.encode(encoding)
+            if new_buffer == self.file_buffer:
+                # e.g. every '#' was inside a string: leave the file and its mtime alone
+                logger.info(f"No notes removed, skipped: {file_path}")
+                return
+            # Back up only once it is known the file is going to change
+            self.__create_backup(file_path)
+            write_source_bytes(self.file_path, new_buffer)
+            # One summary record instead of one record per removed note
+            logger.info(
+                f"Removed {self.removed_notes_number} single-line notes and "
+                f"{self.removed_multi_line_comments_number} multi-line comments"
+            )
             logger.success(f"Modified file: {file_path}")
         except (IndexError, FileNotFoundError) as e:
             logger.error(f"Error: {e}\nfile_path: {file_path}")
 
-    def __analyze_single_line_note(self) -> None:
+    def __rebuild_without_notes(
+        self, comment_columns: dict, remove_mask: bytearray, line_starts: list[int]
+    ) -> None:
         """
-        Analyzing single-line comments
-        (lines starting with '#' and lines included '#')
+        Rebuilds the file content without its notes:
+            comments at comment_columns are cut from their line
+            (lines holding only a comment are dropped),
+            line ranges marked in remove_mask (indexed by line number) are dropped,
+            or replaced by 'pass' where they are the only statement of a block
+        Done with one join over slices of the original text: runs of untouched
+        lines are copied as a single slice, only the lines holding a note are visited
         """
-        for line in self.file_content.split("\n"):
-            if line.startswith("#"):
-                self.__remove_single_line_note(
-                    line[1:]
-                )  # Strip from the second character
-            elif "#" in line:
-                index = line.index("#")
-                self.__remove_single_line_note(
-                    line[index + 1 :]
-                )  # Strip from the index after the '#' symbol
-            else:
+        content = self.file_content
+        # (first line, last line, comment column, or -1 for a removed line range
+        # and -2 for a line range replaced by 'pass')
+        events = [
+            (line_number, line_number, column)
+            for line_number, column in comment_columns.items()
+            if not remove_mask[line_number]
+        ]
+        for run in _MASK_RUN_RE.finditer(remove_mask):
+            run_start, run_end = run.span()
+            events.append((run_start, run_end - 1, -remove_mask[run_start]))
+        events.sort()
+
+        # line_starts[i]: offset of the start of line i + 1
+        last_line_number = len(line_starts) - 1
+        parts = []
+        keep_from = 0  # Start of the slice of untouched text not copied yet
+        dropped_last_line = False
+        for first_line, last_line, column in events:
+            line_start = line_starts[first_line - 1]
+            parts.append(content[keep_from:line_start])
+            if column == -1:
+                # Drop the whole line range, newlines included
+                keep_from = line_starts[last_line]
+                dropped_last_line = last_line == last_line_number
+                continue
+            if column == -2:
+                # Keep the block valid: same indentation, same line ending
+                first = content[line_start : line_starts[first_line] - 1]
+                parts.append(first[: len(first) - len(first.lstrip())] + "pass")
+                range_end = line_starts[last_line] - 1
+                if content[range_end - 1 : range_end] == "\r":
+                    range_end -= 1
+                keep_from = range_end
                 continue
+            line_end = (
+                line_starts[first_line] - 1
+            )  # Its newline, or the end of the text
+            code = content[line_start : line_start + column].rstrip()
+            if code:
+                parts.append(code)  # Strip the inline comment, keep its newline
+                # A CRLF line keeps its "\r" too
+                keep_from = line_end - 1 if content[line_end - 1] == "\r" else line_end
+            else:
+                # Lines holding only a comment are dropped
+                keep_from = line_end + 1
+                dropped_last_line = first_line == last_line_number
+        parts.append(content[keep_from:])
+        content = "".join(parts)
+        if dropped_last_line and content.endswith("\n"):
+            # Lines are "\n"-joined: dropping the last line also drops the newline before it
+            content = content[: -2 if content.endswith("\r\n") else -1]
+        self.file_content = content
+        self.removed_notes_number += sum(1 for event in events if event[2] >= 0)
 
-    def __remove_single_line_note(self, note_content: str) -> None:
-        self.file_content = self.file_content.replace(f"#{note_content}\n", "\n")
-        logger.info(f"Removed note: #{note_content}")
+    def __analyze_tokens(self) -> Optional[tuple[dict, tuple]]:
+        """
+        Finds both kinds of notes from one tokenize pass (find_note_tokens,
+        the same notes the counter reports):
+            comment_columns: {line number: column of '#'} for every comment token,
+                so that '#' inside string literals is not taken as a comment
+            line_ranges: (first line, last line, ...) of every standalone
+                triple-quoted string (docstrings and string statements)
+        Returns None if the file can not be tokenized.
+        """
+        try:
+            comments, docstrings = find_note_tokens(self.file_buffer)
+        except (tokenize.TokenError, SyntaxError) as e:
+            logger.warning(f"Tokenize failed, fallback to line analysis: {e}")
+            return None
+        comment_columns = {line_number: column for line_number, column, _ in comments}
+        self.removed_multi_line_comments_number += len(docstrings)
+        return comment_columns, docstrings
 
-    def __analyze_multi_line_comment(self) -> None:
+    def __analyze_with_scanner(self) -> tuple[dict, list]:
         """
-        Analyzing multi-line comments
-        (wrapped by \"\"\" or \'\'\'\' and not within the body of the function (outer layer not wrapped by parentheses))
+        Finds both kinds of notes for files tokenize can not handle, with one
+        pass of scan_notes over the text that keeps track of string literals:
+        standalone strings wrapped by \"\"\" or \'\'\' (not part of an expression)
+        are found, and only a '#' outside of any string is taken
+        as the start of a comment.
+        Returns the same (comment_columns, line_ranges) as __analyze_tokens
         """
-        pattern = r'(?s)(?<!\( )((\'{3}|"{3})(.+?)\2)(?!\s*\))'
-        matches = re.findall(pattern, self.file_content)
-        for match in matches:
-            # Match to a multi-line comment and delete the annotation content
-            self.__remove_multi_line_comment(match)
-
-    def __remove_multi_line_comment(self, match: re.Match) -> None:
-        # Except some special cases
-        if "'''" in match[0] or "print(" in match[0]:
-            logger.info(f"Skipped multi-line comment including quotes: {match[0]}")
-            return
-        elif match[0].startswith(","):
-            logger.info(f"Skipped multi-line comment starting with comma: {match[0]}")
-            return
-        elif "+" in match[0] and match[0].endswith("= "):
-            logger.info(
-                f"Skipped multi-line comment starting with plus sign and ending with equal sign: {match[0]}"
-            )
-            return
-        else:
-            self.file_content = self.file_content.replace(f"{match[0]}\n", "", 1)
-            logger.info(f"Removed multi-line comment: {match[0]}")
+        docstring_lines, comment_columns = scan_notes(self.file_content)
+        self.removed_multi_line_comments_number += len(docstring_lines)
+        return comment_columns, docstring_lines
 
 
 def test():
     print("Test to remove . /tests/examples/example2.py file's comments.")
-    py_file_path = Path("tests\examples\example2.py")
+    py_file_path = Path("tests/examples/example2.py")
     RemoveSinglePyFileNotes(py_file_path)
 
 
@@ -0,0 +1,148 @@
+import re
+
+# The only characters the scanner has to stop at; everything between two of
+# them is names, numbers, operators or blanks and is skipped in one step
+_SPECIAL_RE = re.compile(r"[\n#\\'\"()\[\]{}]")
+_CODE_RE = re.compile(r"[^ \t\f\r]")  # Anything but blanks
+
+_STRING_PREFIXES = frozenset({"r", "u", "b", "f", "br", "rb", "fr", "rf"})
+
+
+def _find_string_end(src: str, quote_index: int, delimiter: str) -> int:
+    """
+    Returns the index just past the string literal whose opening delimiter starts at quote_index,
+    or -1 if the string is not terminated (a single-quoted string then stops at the newline).
+    Backslash escapes are skipped.
+    Jumps between delimiters and backslashes with str.find instead of
+    stepping through the string one character at a time.
+    """
+    n = len(src)
+    triple = len(delimiter) == 3
+    i = quote_index + len(delimiter)
+    while True:
+        end = src.find(delimiter, i)
+        limit = n if end == -1 else end
+        backslash = src.find("\\", i, limit)
+        if (
+            not triple
+            and src.find("\n", i, limit if backslash == -1 else backslash) != -1
+        ):
+            return -1
+        if backslash == -1:
+            return -1 if end == -1 else end + len(delimiter)
+        i = backslash + 2
+
+
+def scan_notes(src: str) -> tuple[list[tuple[int, int]], dict]:
+    """
+    Finds the notes of a source tokenize can not handle, in a single pass
+    over the text that keeps track of string literals
+    (jumping with a regex from one newline, '#', backslash, quote or bracket
+    to the next, instead of looking at every character):
+        docstring_lines: (first line, last line) of every standalone
+            triple-quoted string (docstrings and string statements, f-strings aside)
+        comment_columns: {line number: column} of the first '#' of every line
+            that is outside of any string literal
+
+    A triple-quoted string is standalone when it starts a statement
+    (only indentation before it on its line, outside of any bracket)
+    and nothing but whitespace or a comment follows it on its closing line.
+    An unterminated triple-quoted string ends the scan: the rest of the file
+    is left untouched.
+    """
+    docstring_lines = []
+    comment_columns = {}
+    n = len(src)
+    i = 0
+    depth = 0  # Bracket nesting level
+    line_number = 1
+    line_start = 0
+    code_on_line = False
+    pending_line = -1  # First line of a standalone string waiting for its end of line
+    while True:
+        special = _SPECIAL_RE.search(src, i)
+        j = n if special is None else special.start()
+        ch = "" if special is None else src[j]
+        k = j  # End of the plain text before the special character
+        if ch == "'" or ch == '"':
+            # A string literal: its prefix (if any) is the name right before the quote
+            while k > i and (src[k - 1].isalnum() or src[k - 1] == "_"):
+                k -= 1
+            if src[k:j].lower() not in _STRING_PREFIXES:
+                k = j
+        if k > i and _CODE_RE.search(src, i, k) is not None:
+            # Names, numbers or operators before the special character
+            pending_line = -1
+            code_on_line = True
+        if special is None:
+            break
+        if ch == "\n":
+            if pending_line != -1:
+                docstring_lines.append((pending_line, line_number))
+                pending_line = -1
+            i = j + 1
+            line_number += 1
+            line_start = i
+            code_on_line = False
+        elif ch == "#":
+            # Skip the comment, up to the newline
+            comment_columns[line_number] = j - line_start
+            i = src.find("\n", j)
+            if i == -1:
+                break
+        elif ch == "\\":
+            # Line continuation: the next line belongs to the same statement
+            pending_line = -1
+            code_on_line = True
+            if src.startswith("\n", j + 1):
+                line_number += 1
+                line_start = j + 2
+            i = j + 2
+        elif ch in "'\"":
+            # A string literal, with an optional prefix
+            pending_line = -1
+            delimiter = ch * 3 if src.startswith(ch * 3, j) else ch
+            string_end = _find_string_end(src, j, delimiter)
+            if string_end == -1:
+                # Unterminated: leave the rest of the line (or file) untouched
+                if len(delimiter) == 3:
+                    break
+                code_on_line = True
+                i = src.find("\n", j)
+                if i == -1:
+                    break
+                continue
+            if (
+                len(delimiter) == 3
+                and depth == 0
+                and not code_on_line
+                and "f" not in src[k:j].lower()  # Same as find_note_tokens
+            ):
+                pending_line = line_number
+            newlines = src.count("\n", j, string_end)
+            if newlines:
+                # Keep the line count right past a multi-line string
+                line_number += newlines
+                line_start = src.rfind("\n", j, string_end) + 1
+            code_on_line = True
+            i = string_end
+        else:
+            pending_line = -1
+            code_on_line = True
+            if ch in "([{":
+                depth += 1
+            elif depth > 0:
+                depth -= 1
+            i = j + 1
+    if pending_line != -1:
+        docstring_lines.append((pending_line, line_number))
+    return docstring_lines, comment_columns
+
+
+def test():
+    src = 'x = "# not a comment"  # comment\n"""doc\nstring"""\n'
+    print(scan_notes(src))
+
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,72 @@
+import io
+import os
+import tokenize
+from pathlib import Path
+
+_BINARY_FLAGS = getattr(os, "O_BINARY", 0) | getattr(os, "O_CLOEXEC", 0)
+_READ_FLAGS = os.O_RDONLY | _BINARY_FLAGS
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | _BINARY_FLAGS
+
+
+def read_source_bytes(file_path: Path) -> bytes:
+    """
+    Reads the raw bytes of a source file.
+    Uses os.open + os.read directly, skipping the BufferedReader construction
+    and the extra fstat/lseek/isatty syscalls of read_text.
+    """
+    fd = os.open(file_path, _READ_FLAGS)
+    try:
+        chunks = []
+        while True:
+            chunk = os.read(fd, 1 << 20)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+    return b"".join(chunks)
+
+
+def write_source_bytes(file_path: Path, data: bytes) -> None:
+    """
+    Writes the whole content of a source file with os.write on a single buffer,
+    the write-side counterpart of read_source_bytes (no BufferedWriter in between).
+    """
+    fd = os.open(file_path, _WRITE_FLAGS, 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            # os.write may write less than asked for
+            view = view[os.write(fd, view) :]
+    finally:
+        os.close(fd)
+
+
+def decode_source(raw: bytes) -> tuple[str, str]:
+    """
+    Decodes a source file according to its PEP 263 coding cookie (UTF-8 by default),
+    with newlines normalized to LF.
+    Returns the content and the encoding used, so the file can be written back the same way.
+    """
+    encoding, _ = tokenize.detect_encoding(io.BytesIO(raw).readline)
+    content = raw.decode(encoding)
+    if "\r" in content:
+        # Same as the universal newlines mode of read_text
+        content = content.replace("\r\n", "\n").replace("\r", "\n")
+    return content, encoding
+
+
+def has_triple_quotes(raw: bytes) -> bool:
+    """
+    A file without \"\"\" or \'\'\' can not hold a docstring,
+    so only its comment tokens need to be looked at.
+    """
+    return b'"""' in raw or b"'''" in raw
+
+
+def may_have_notes(raw: bytes) -> bool:
+    """
+    Cheap byte scan run before any tokenizing: a file without '#', \"\"\" or \'\'\'
+    can not hold a comment or a docstring.
+    """
+    return b"#" in raw or has_triple_quotes(raw)
@@ -0,0 +1,113 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from loguru import logger
+
+from src.utils.remove_single_py_file_notes import RemoveSinglePyFileNotes
+
+
+def setUpModule():
+    logger.disable("src.utils.remove_single_py_file_notes")
+
+
+def tearDownModule():
+    logger.enable("src.utils.remove_single_py_file_notes")
+
+
+class TestRemove(unittest.TestCase):
+    """
+    Runs RemoveSinglePyFileNotes on a temporary file and checks the bytes
+    written back and the two counters
+    """
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.py_file_path = Path(temp_dir.name) / "example.py"
+
+    def assertRemoved(
+        self,
+        raw: bytes,
+        expected: bytes,
+        removed_notes_number: int,
+        removed_multi_line_comments_number: int,
+    ):
+        self.py_file_path.write_bytes(raw)
+        result = RemoveSinglePyFileNotes(self.py_file_path)
+        self.assertEqual(self.py_file_path.read_bytes(), expected)
+        self.assertEqual(result.removed_notes_number, removed_notes_number)
+        self.assertEqual(
+            result.removed_multi_line_comments_number,
+            removed_multi_line_comments_number,
+        )
+        # Valid input stays valid, and the original is kept as the backup
+        try:
+            compile(raw, str(self.py_file_path), "exec")
+        except SyntaxError:
+            pass
+        else:
+            compile(expected, str(self.py_file_path), "exec")
+        self.assertEqual(self.py_file_path.with_suffix(".py.bak").read_bytes(), raw)
+
+    def test_comments_and_docstrings(self):
+        self.assertRemoved(
+            b'"""module"""\n# only\nx = 1  # c\ns = "# not a comment"\n',
+            b'x = 1\ns = "# not a comment"\n',
+            2,
+            1,
+        )
+
+    def test_only_docstring_of_a_class(self):
+        self.assertRemoved(
+            b'class E(Exception):\n    """doc"""\n',
+            b"class E(Exception):\n    pass\n",
+            0,
+            1,
+        )
+
+    def test_class_body_made_only_of_strings(self):
+        self.assertRemoved(
+            b'class A:\n    """doc"""\n    """more"""  # c\n    # d\nx = 1  # e\n',
+            b"class A:\n    pass\nx = 1\n",
+            # The comment after a removed string goes with it, uncounted
+            2,
+            2,
+        )
+
+    def test_shebang_and_coding_cookie_are_kept(self):
+        self.assertRemoved(
+            b'#!/usr/bin/env python\n# -*- coding: latin-1 -*-\n# drop\nx = "\xe9"  # \xe9\n',
+            b'#!/usr/bin/env python\n# -*- coding: latin-1 -*-\nx = "\xe9"\n',
+            2,
+            0,
+        )
+
+    def test_mixed_line_endings(self):
+        self.assertRemoved(
+            b'a = 1\r\nb = 2  # c\nc = 3  # d\r\n# only\r\ndef f():\n    """doc"""\r\n',
+            b"a = 1\r\nb = 2\nc = 3\r\ndef f():\n    pass\r\n",
+            3,
+            1,
+        )
+
+    def test_scanner_fallback(self):
+        # The dedent to a column never used makes tokenize fail
+        self.assertRemoved(
+            b'def f():\n    """doc"""\n  x = 1  # c\n',
+            b"def f():\n    pass\n  x = 1\n",
+            1,
+            1,
+        )
+
+    def test_unchanged_file_is_left_alone(self):
+        raw = b's = "# not a comment"\n'
+        self.py_file_path.write_bytes(raw)
+        result = RemoveSinglePyFileNotes(self.py_file_path)
+        self.assertEqual(self.py_file_path.read_bytes(), raw)
+        self.assertEqual(result.removed_notes_number, 0)
+        self.assertFalse(self.py_file_path.with_suffix(".py.bak").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import codecs
+import tokenize
+import unittest
+from itertools import permutations
+from pathlib import Path
+
+from src.utils.note_tokens import find_note_tokens
+from src.utils.scan_notes import scan_notes
+from src.utils.source_file import decode_source
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+# Snippets that tokenize, combined for the comparison with find_note_tokens
+SNIPPETS = [
+    '"""doc"""',
+    "x = 1  # c",
+    "# only a comment",
+    's = "# not a comment"  # but this is',
+    "t = rb'#' + f\"#{x!r}\"  # prefixes",
+    "u = 'it\\'s'  # escaped quote",
+    '"""multi\nline"""  # after',
+    "def f():\n    '''doc'''\n    return 1  # r",
+    "y = (1,  # in brackets\n     '''not a docstring''')",
+    "z = 1 + \\\n    2  # continued",
+    'a = """x""" """y"""',
+    'b = 1; """after a semicolon"""',
+    "class A:\n    '''doc'''  # c\n    x = 1",
+    'def g():\n    x = 1\n    f"""doc {x}"""  # c\n    return x',
+    "Rf'''{1}'''",
+]
+
+
+def _scan(src: str) -> tuple[list[tuple[int, int]], dict]:
+    """
+    scan_notes on the text callers give it: decoded with decode_source,
+    so CRLF and BOM are already gone
+    """
+    content, _ = decode_source(src.encode("utf-8"))
+    return scan_notes(content)
+
+
+def _from_tokens(raw: bytes) -> tuple[list[tuple[int, int]], dict]:
+    comments, docstrings = find_note_tokens(raw)
+    return (
+        [(first_line, last_line) for first_line, last_line, _ in docstrings],
+        {line_number: column for line_number, column, _ in comments},
+    )
+
+
+class TestStrings(unittest.TestCase):
+    def test_hash_inside_string_is_not_a_comment(self):
+        self.assertEqual(scan_notes('s = "# no"\n'), ([], {}))
+
+    def test_string_prefixes(self):
+        self.assertEqual(scan_notes('x = rb"#no"  # c\n'), ([], {1: 13}))
+        self.assertEqual(scan_notes('R"""doc"""\nf\'#\'  # c\n'), ([(1, 1)], {2: 6}))
+        # A name right before a quote is only a prefix when it is one
+        self.assertEqual(scan_notes('name"#"\n'), ([], {}))
+
+    def test_escapes(self):
+        self.assertEqual(scan_notes('s = "a\\"#b"  # c\n'), ([], {1: 13}))
+        self.assertEqual(scan_notes("s = 'it\\'s'  # c\n"), ([], {1: 13}))
+        self.assertEqual(scan_notes('"""a\\"""  # x"""\n'), ([(1, 1)], {}))
+
+    def test_backslash_continuation(self):
+        self.assertEqual(scan_notes("x = 1 + \\\n    2  # c\n"), ([], {2: 7}))
+        # A string on a continued line is part of the statement
+        self.assertEqual(scan_notes('x = \\\n"""s"""\n'), ([], {}))
+
+    def test_f_string_is_not_a_note(self):
+        src = 'def f():\n    x = 1\n    f"""doc {x}"""\n    return x\n'
+        self.assertEqual(scan_notes(src), ([], {}))
+        self.assertEqual(find_note_tokens(src.encode("utf-8")), ((), ()))
+
+    def test_string_in_expression_is_not_standalone(self):
+        self.assertEqual(scan_notes('x = 1; """s"""\n'), ([], {}))
+        self.assertEqual(scan_notes('"""a""" "b"\n'), ([], {}))
+
+
+class TestUnterminated(unittest.TestCase):
+    def test_unterminated_single_quoted_string(self):
+        # The rest of the line is left alone, the next line is scanned again
+        self.assertEqual(scan_notes('s = "abc  # c\nx = 1  # d\n'), ([], {2: 7}))
+
+    def test_unterminated_triple_quoted_string(self):
+        # Ends the scan: nothing after it is taken as a note
+        self.assertEqual(scan_notes('x = 1  # a\n"""never\n# no\n'), ([], {1: 7}))
+
+
+class TestBrackets(unittest.TestCase):
+    def test_string_inside_brackets_is_not_standalone(self):
+        self.assertEqual(scan_notes('f(\n"""arg"""\n)\n'), ([], {}))
+
+    def test_depth_is_back_to_zero_after_closing(self):
+        self.assertEqual(
+            scan_notes('x = [1,\n  2]  # c\n"""doc"""\n'), ([(3, 3)], {2: 6})
+        )
+
+
+class TestLineEnds(unittest.TestCase):
+    def test_last_line_without_newline(self):
+        self.assertEqual(scan_notes('"""doc"""'), ([(1, 1)], {}))
+        self.assertEqual(scan_notes("x = 1  # c"), ([], {1: 7}))
+
+    def test_multi_line_string_keeps_line_numbers(self):
+        self.assertEqual(scan_notes('"""a\nb"""  # c\nx = 1\n'), ([(1, 2)], {2: 6}))
+
+    def test_crlf(self):
+        src = 'x = 1 + \\\n    2  # c\n"""a\nb"""\ny = 1  # d\n'
+        self.assertEqual(_scan(src.replace("\n", "\r\n")), _scan(src))
+
+    def test_bom(self):
+        raw = codecs.BOM_UTF8 + b'"""doc"""\n# c\n'
+        content, _ = decode_source(raw)
+        self.assertEqual(scan_notes(content), ([(1, 1)], {2: 0}))
+
+
+class TestSameAsTokenize(unittest.TestCase):
+    """
+    On input tokenize can handle, the fallback scanner must find exactly
+    the notes find_note_tokens finds
+    """
+
+    def assertSameNotes(self, raw: bytes):
+        content, _ = decode_source(raw)
+        self.assertEqual(scan_notes(content), _from_tokens(raw), raw)
+
+    def test_snippet_pairs(self):
+        for first, second in permutations(SNIPPETS, 2):
+            raw = f"{first}\n{second}\n".encode("utf-8")
+            try:
+                find_note_tokens(raw)
+            except (tokenize.TokenError, SyntaxError):
+                continue
+            self.assertSameNotes(raw)
+            self.assertSameNotes(raw.replace(b"\n", b"\r\n"))
+
+    def test_own_sources(self):
+        for py_file_path in sorted(SRC_DIR.rglob("*.py")):
+            raw = py_file_path.read_bytes()
+            with self.subTest(py_file_path=py_file_path):
+                self.assertSameNotes(raw)
+
+
+if __name__ == "__main__":
+    unittest.main()